@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 
 
 # Copyright 2017 Seth J. Morabito <web@loomcom.com>
@@ -26,108 +26,81 @@
 # exported from Saleae Logic
 #
 
-import csv
 import sys
-from decimal import *
-
-class CommandParser:
-
-    def get_command_name(self, val):
-        """Translate a 1-byte command into a name"""
-
-        cmd = val >> 4
-
-        if cmd == 0x0:
-            return "Restore"
-        elif cmd == 0x1:
-            return "Seek"
-        elif cmd == 0x2 or val == 0x3:
-            return "Step"
-        elif cmd == 0x4 or val == 0x5:
-            return "Step In"
-        elif cmd == 0x6 or val == 0x7:
-            return "Step Out"
-        elif cmd == 0x8 or val == 0x9:
-            return "Read Sector"
-        elif cmd == 0xa or val == 0xb:
-            return "Write Sector"
-        elif cmd == 0xc:
-            return "Read Address"
-        elif cmd == 0xd:
-            return "Force Interrupt"
-        elif cmd == 0xe:
-            return "Read Track"
-        elif cmd == 0xf:
-            return "Write Track"
-        else:
-            return "????"
-
-    def handle_row(self, ts, val):
-        """Take one row of CSV data and parse it into human readable form"""
-
-        num = int(val, 16)
-
-        # The number we get is a 16-bit value with:
-        #   - Address encoded in bits 0-3
-        #   - Data encodedin bits 4-11
-        #   - Chip Enable encoded in bit 12
-        #   - Write Gate encoded in bit 13
-        #   - Read Gate encoded in bit 14
-        #   - Interrupt encoded in bit 15
-
-
-        # We only care about the RISING edge of a CHIP SELECT,
-        # and only if READ GATE or WRITE GATE is low at that time.
 
-        skip_line = False
+from parser_core import CaptureParser, READ
+
+def command_name(val):
+    """Translate a 1-byte command into a name"""
+
+    cmd = val >> 4
+
+    if cmd == 0x0:
+        return "Restore"
+    elif cmd == 0x1:
+        return "Seek"
+    elif cmd == 0x2 or val == 0x3:
+        return "Step"
+    elif cmd == 0x4 or val == 0x5:
+        return "Step In"
+    elif cmd == 0x6 or val == 0x7:
+        return "Step Out"
+    elif cmd == 0x8 or val == 0x9:
+        return "Read Sector"
+    elif cmd == 0xa or val == 0xb:
+        return "Write Sector"
+    elif cmd == 0xc:
+        return "Read Address"
+    elif cmd == 0xd:
+        return "Force Interrupt"
+    elif cmd == 0xe:
+        return "Read Track"
+    elif cmd == 0xf:
+        return "Write Track"
+    else:
+        return "????"
+
+# Every command byte is translated up front, so decoding a command
+# is a single table lookup.
+COMMAND_NAMES = [command_name(val) for val in range(256)]
+
+class CommandParser(CaptureParser):
+    # The number we get is a 16-bit value with:
+    #   - Address encoded in bits 0-3
+    #   - Data encodedin bits 4-11
+    #   - Chip Enable encoded in bit 12
+    #   - Write Gate encoded in bit 13
+    #   - Read Gate encoded in bit 14
+    #   - Interrupt encoded in bit 15
+
+    R_BIT   = 14
+    W_BIT   = 13
+    CS_BIT  = 12
+    INT_BIT = 15
+
+    # Read and write gates and interrupt high before the capture starts
+    INITIAL = 0xe000
+
+    get_command_name = COMMAND_NAMES.__getitem__
+
+    def format_intr(self, ts):
+        """Describe the rising edge of an interrupt"""
+
+        return "%s:\tIRQ\t%s\t\tDELTA=%.6f ms" % \
+            (ts, "INTR", (float(ts) - self.last_cmd) * 1000)
+
+    def format_row(self, ts, num, kind):
+        """Take one clocked sample and parse it into a human readable line"""
 
         addr       = num & 0xf
         data       = (num >> 4) & 0xff
-        cen_state  = (num >> 12) & 1
-        w_state    = (num >> 13) & 1
-        r_state    = (num >> 14) & 1
-        int_state  = (num >> 15) & 1
-
-        # No clock transition?
-        if self.last_r_state == r_state and \
-           self.last_w_state == w_state:
-            skip_line = True
-
-        # Falling edge?
-        if (self.last_r_state == 1 and r_state == 0) or \
-           (self.last_w_state == 1 and w_state == 0):
-            skip_line = True
-
-        # Rising edge?
-        if (self.last_r_state == 0 and r_state == 1) or \
-           (self.last_w_state == 0 and w_state == 1):
-            skip_line = False
-
-        if cen_state == 1:
-	    skip_line = True
-
-        # Special case. Capture the rising edge of an int.
-        if int_state == 1 and self.last_int_state == 0:
-            print "%s:\tIRQ\t%s\t\tDELTA=%s ms" % \
-                (ts, "INTR", ((ts - self.last_cmd) * 1000).normalize())
-            skip_line = True
-
-        if skip_line == True:
-            self.last_w_state = w_state
-            self.last_r_state = r_state
-            self.last_int_state = int_state
-            return
-
-        if self.last_r_state == 0:
+
+        if kind & READ:
             direction = "READ"
         else:
             direction = "WRITE"
 
-        print "%s:\t%s\t%x\t%02x" % (ts, direction, addr, data)
-
-        self.last_w_state = w_state
-        self.last_r_state = r_state
-        self.last_int_state = int_state
+        return "%s:\t%s\t%x\t%02x" % (ts, direction, addr, data)
 
 
         # # Now grab some data
@@ -137,7 +110,7 @@ class CommandParser:
         # elif is_write:
         #     direction = "WRITE"
         # else:
-        #     raise "Impossible state"
+        #     raise RuntimeError("Impossible state")
 
         # if is_status:
         #     buf = "STATUS"
@@ -162,39 +135,25 @@ class CommandParser:
         # if is_command:
         #     command_name = self.get_command_name(data)
 
-        #     self.last_cmd = Decimal(ts)
+        #     self.last_cmd = float(ts)
 
         #     # If this is a READ SECTOR, output C/H/S
         #     if data & 0xe0 == 0x80 or data & 0xe0 == 0xa0:
-        #         print "%s:\t%s\t%s\t%02x\t%s %d/%d/%d" % \
+        #         print("%s:\t%s\t%s\t%02x\t%s %d/%d/%d" % \
         #             (ts, direction, buf, data, command_name, \
-        #              self.track, ((data >> 1) & 1), self.sec)
+        #              self.track, ((data >> 1) & 1), self.sec))
         #     else:
-        #         print "%s:\t%s\t%s\t%02x\t%s" % (ts, direction, buf, data, command_name)
+        #         print("%s:\t%s\t%s\t%02x\t%s" % (ts, direction, buf, data, command_name))
         # else:
-        #     print "%s:\t%s\t%s\t%02x" % (ts, direction, buf, data)
+        #     print("%s:\t%s\t%s\t%02x" % (ts, direction, buf, data))
 
 
         # self.last_r_state = r_state
         # self.last_w_state = w_state
         # self.last_int_state = int_state
 
-    def main(self, fname):
-
-        self.last_w_state = 1
-        self.last_r_state = 1
-        self.last_int_state = 1
-        self.last_cmd = 0
-
-        with open(fname, 'rb') as csvfile:
-            reader = csv.reader(csvfile, delimiter=',', quotechar='\\')
-            for row in reader:
-                ts = Decimal(row[0])
-                val = row[1]
-                self.handle_row(ts, val)
-
 if __name__ == '__main__':
     if len(sys.argv) != 2:
-        print "Usage: parse_iu_commands.py <file>"
+        print("Usage: parse_iu_commands.py <file>")
         exit(1)
     CommandParser().main(sys.argv[1])
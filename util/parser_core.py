@@ -0,0 +1,176 @@
+# Copyright 2017 Seth J. Morabito <web@loomcom.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is furnished to do
+# so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+#
+# Shared decoding for the parse_i*_commands.py scripts, which parse
+# bus activity out of CSV files exported from Saleae Logic
+#
+
+import csv
+import os
+import sys
+
+import numpy as np
+
+# The Numba kernel is opt-in: set PARSER_CORE_NUMBA=1 to use it.
+# Importing numba and loading the cached kernel costs more than the
+# NumPy version spends on any capture we've seen.
+njit = None
+if os.environ.get('PARSER_CORE_NUMBA'):
+    try:
+        from numba import njit
+    except ImportError:
+        pass
+
+# Kinds of event found in a capture
+READ  = 1
+WRITE = 2
+INTR  = 4
+
+# Number of output lines buffered before each write
+OUTPUT_CHUNK = 4096
+
+def previous(states, initial):
+    """Return the state each sample transitioned from"""
+    last = np.empty_like(states)
+    last[0] = initial
+    last[1:] = states[:-1]
+    return last
+
+if njit is not None:
+    @njit(cache=True)
+    def scan(samples, r_bit, w_bit, cs_bit, int_bit, initial, events, kinds):
+        """Store the index and kind of every sample worth reporting in
+        events and kinds, and return how many there were"""
+
+        last = initial
+        n = 0
+
+        for i in range(samples.shape[0]):
+            num = samples[i]
+            low = ~last
+            rose = low & num
+
+            if (rose >> int_bit) & 1:
+                events[n] = i
+                kinds[n] = INTR
+                n += 1
+            elif ((rose >> r_bit) | (rose >> w_bit)) & (~num >> cs_bit) & 1:
+                events[n] = i
+                kinds[n] = ((low >> r_bit) & 1) * READ | \
+                           ((low >> w_bit) & 1) * WRITE
+                n += 1
+
+            last = num
+
+        return n
+
+    def find_events(samples, r_bit, w_bit, cs_bit, int_bit, initial):
+        """Return the index and kind of every sample worth reporting"""
+
+        events = np.empty(len(samples), dtype=np.intp)
+        kinds = np.empty(len(samples), dtype=np.uint8)
+        n = scan(samples, r_bit, w_bit, cs_bit, int_bit,
+                 samples.dtype.type(initial), events, kinds)
+        return events[:n], kinds[:n]
+else:
+    def find_events(samples, r_bit, w_bit, cs_bit, int_bit, initial):
+        """Return the index and kind of every sample worth reporting.
+
+        r_bit, w_bit, cs_bit and int_bit are the bit positions of the read
+        and write clocks, the active low chip select and the interrupt, and
+        initial is the sample the capture is taken to start from."""
+
+        # Every signal is tested at once on the packed words: a bit is set
+        # in low wherever that signal was low on the previous sample, and in
+        # rose wherever it went from low to high.
+        low  = ~previous(samples, initial)
+        rose = low & samples
+
+        # We only care about the RISING edge of either clock, and only if
+        # chip select is low. Samples with no clock transition, or a
+        # falling one, are skipped.
+        rising = ((rose >> r_bit) | (rose >> w_bit)) & \
+                 (~samples >> cs_bit) & 1
+
+        # Special case. Capture the rising edge of an int.
+        intr = (rose >> int_bit) & 1
+
+        keep = rising & ~intr
+
+        kinds = np.where(intr, INTR,
+                         ((low >> r_bit) & 1) * READ |
+                         ((low >> w_bit) & 1) * WRITE)
+        events = np.flatnonzero(keep | intr)
+
+        return events, kinds[events]
+
+class CaptureParser:
+    """Common driver for the command parsers.
+
+    Subclasses set R_BIT, W_BIT, CS_BIT and INT_BIT to the bit positions
+    of their clocks and control lines, INITIAL to the sample before the
+    capture starts, and implement format_intr() and format_row() to turn
+    one event into a line of output."""
+
+    def main(self, fname):
+
+        self.last_cmd = 0
+
+        timestamps = []
+        values = []
+
+        with open(fname, 'r', newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=',', quotechar='\\')
+            for row in reader:
+                timestamps.append(row[0])
+                values.append(row[1])
+
+        if not values:
+            return
+
+        samples = np.fromiter((int(val, 16) for val in values),
+                              dtype=np.uint32, count=len(values))
+
+        events, kinds = find_events(samples, self.R_BIT, self.W_BIT,
+                                    self.CS_BIT, self.INT_BIT, self.INITIAL)
+
+        # Write the output in large chunks rather than a line at a time
+        lines = []
+
+        # Look up everything used per event once, outside the loop
+        format_intr = self.format_intr
+        format_row = self.format_row
+        write = sys.stdout.write
+        append = lines.append
+
+        for i, num, kind in zip(events.tolist(), samples[events].tolist(),
+                                kinds.tolist()):
+            if kind == INTR:
+                append(format_intr(timestamps[i]))
+            else:
+                append(format_row(timestamps[i], num, kind))
+
+            if len(lines) == OUTPUT_CHUNK:
+                write("\n".join(lines) + "\n")
+                lines.clear()
+
+        if lines:
+            write("\n".join(lines) + "\n")
@@ -2,9 +2,10 @@
 
 from __future__ import print_function
 import sys, re
-from collections import namedtuple
+from collections import deque, namedtuple
 
 # Each entry has:
+#   - System call number
 #   - Number of arguments
 #   - Name of routine
 syscalls = [
@@ -18,7 +19,7 @@ syscalls = [
     (7, 0, 'wait'),
     (8, 2, 'creat'),
     (9, 2, 'link'),
-    (0, 1, 'unlink'),
+    (10, 1, 'unlink'),
     (11, 2, 'exec'),
     (12, 1, 'chdir'),
     (13, 0, 'gtime'),
@@ -98,6 +99,9 @@ syscalls = [
     (87, 3, 'poll')
 ]
 
+# Number of arguments and name of routine, keyed by system call number
+SYSCALLS = {num: (argc, name) for (num, argc, name) in syscalls}
+
 #
 # A SystemCall represents an individual call
 #
@@ -112,35 +116,39 @@ def eprint(*args, **kwargs):
 class SyscallFinder:
 
     def __init__(self, infile):
-        self.pattern = re.compile(r'GATE')
         self.addr_pattern = re.compile(r'^[a-f0-9]{8} ([a-f0-9]{8})\|')
         self.infile = infile
-        with open(self.infile, 'r') as f:
-            self.lines = f.readlines()
 
-    def get_syscall(self, gate_line):
+    def get_syscall(self, gate_line, line, prev_line):
         # The line previous to the GATE will contain the
         # syscall number.
-        addr = re.match(self.addr_pattern, self.lines[gate_line]).group(1)
-        hexnum = re.split(":? +", self.lines[gate_line - 1])[1]
-        call_num = int(int(hexnum, 16) / 8)
-        argc = syscalls[call_num][1]
-        call_name = syscalls[call_num][2]
+        addr = self.addr_pattern.match(line).group(1)
+        hexnum = prev_line.split(None, 2)[1].rstrip(':')
+        call_num = int(hexnum, 16) >> 3
+        entry = SYSCALLS.get(call_num)
+        if entry is None:
+            argc, call_name = 0, 'nosys'
+        else:
+            argc, call_name = entry
 
         return SystemCall(gate_line, addr, call_num, call_name, argc, [])
 
 
-    def handle_syscall(self, gate_line):
-        system_call = self.get_syscall(gate_line)
+    def handle_syscall(self, gate_line, line, prev_line):
+        system_call = self.get_syscall(gate_line, line, prev_line)
 
         print(system_call)
-        # for j in range(30, 3, -1):
-        #     sys.stdout.write(self.lines[gate_line - j])
 
     def find_syscalls(self):
-        for i in range(len(self.lines)):
-            if self.pattern.search(self.lines[i]):
-                self.handle_syscall(i)
+        # Stream the log through a window holding the current line
+        # and the one before it.
+        window = deque(maxlen=2)
+        with open(self.infile, 'r') as f:
+            for i, line in enumerate(f):
+                window.append(line)
+                if 'GATE' in line and len(window) == 2:
+                    prev_line, line = window
+                    self.handle_syscall(i, line, prev_line)
 
 if __name__ == "__main__":
     if len(sys.argv) != 2: